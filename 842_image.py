@@ -1,13 +1,22 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.cbook import boxplot_stats
 import os
 import csv
+import shutil
+import multiprocessing
 
 # --- Configuration ---
-np.random.seed(2025)
+# All data sets are drawn in the parent process from a Generator seeded with
+# `seed`; the workers only render those arrays. Each plot's jitter comes from
+# its own Generator seeded with (seed, trial_idx), so the output does not
+# depend on which worker renders which trial.
+seed = 2025
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 output_dir = os.path.join(script_dir, "boxplot_stimuli")
+all_dir = os.path.join(output_dir, "All")  # every plot, regardless of design
 os.makedirs(output_dir, exist_ok=True)
 
 conditions = [
@@ -19,26 +28,65 @@ conditions = [
     ("Jitter On", "MinMax", "Points Off")   # Jitter doesn't matter when points are off, but kept for consistency
 ]
 
+# Whisker reach passed to boxplot_stats for each whisker type
+whis_values = {"Tukey": 1.5, "MinMax": (0, 100)}
+
 trial_types = ["Different SDs", "Outlier vs No-Outlier", "Skew vs Symmetric", "Unequal Sample Size"]
+max_n = 80  # largest sample size drawn for either side of any trial type
+num_instances_per_trial_type = 4  # number of different data sets per trial type
+
+# Fixed y-axis range per trial type (mu=5). Wide enough for the sampled tails
+# and the fixed outliers, so no autoscaling pass is needed per plot.
+ylims = {
+    "Different SDs": (-3, 13),
+    "Outlier vs No-Outlier": (-8, 20),
+    "Skew vs Symmetric": (0, 18),
+    "Unequal Sample Size": (-2, 12),
+}
 
 # --- Function to generate data ---
-def generate_trial_data(trial_type):
+def generate_trial_data(trial_type, normals, gammas):
+    """Build one data set from pre-drawn samples.
+
+    normals: standard normal draws of shape (2, max_n), one row per side
+    gammas: Gamma(2, 1) draws of shape (max_n,)
+    """
     mu = 5
     if trial_type == "Different SDs":
-        left = np.random.normal(mu, 1.0, 50)
-        right = np.random.normal(mu, 2.0, 50)
+        left = mu + 1.0 * normals[0, :50]
+        right = mu + 2.0 * normals[1, :50]
     elif trial_type == "Outlier vs No-Outlier":
-        left = np.random.normal(mu, 1.0, 50)
+        left = mu + 1.0 * normals[0, :50]
         left = np.append(left, [mu+8, mu+10, mu-8, mu-10, mu+12])  # extreme outliers
-        right = np.random.normal(mu, 1.2, 50)
+        right = mu + 1.2 * normals[1, :50]
     elif trial_type == "Skew vs Symmetric":
-        left = np.random.gamma(shape=2.0, scale=1.0, size=50) + mu - 2
-        right = np.random.normal(mu, 1.0, 50)
+        left = gammas[:50] + mu - 2
+        right = mu + 1.0 * normals[1, :50]
     elif trial_type == "Unequal Sample Size":
-        left = np.random.normal(mu, 1.0, 80)
-        right = np.random.normal(mu, 1.2, 20)
+        left = mu + 1.0 * normals[0, :80]
+        right = mu + 1.2 * normals[1, :20]
     return left, right
 
+def generate_data_sets(rng):
+    """Draw every data set from rng, as {(trial_type, instance_idx): (left, right)}."""
+    data_sets = {}
+    
+    # Draw the samples for every data set in one call per distribution
+    num_data_sets = len(trial_types) * num_instances_per_trial_type
+    normals = rng.standard_normal((num_data_sets, 2, max_n))
+    gammas = rng.gamma(2.0, 1.0, (num_instances_per_trial_type, max_n))
+    swaps = rng.random(num_data_sets) > 0.5
+
+    for t, trial_type in enumerate(trial_types):
+        for instance in range(num_instances_per_trial_type):
+            k = t * num_instances_per_trial_type + instance
+            left, right = generate_trial_data(trial_type, normals[k], gammas[instance])
+            # Randomly swap left/right for some instances
+            if swaps[k]:
+                left, right = right, left
+            data_sets[(trial_type, instance)] = (left.copy(), right.copy())
+    return data_sets
+
 # --- Function to determine design folder based on condition ---
 def get_design_folder(condition):
     """Organize plots into folders by whisker type and point/jitter combination.
@@ -66,77 +114,104 @@ def get_design_folder(condition):
     # Return the full path: WhiskerType/ComboFolder
     return os.path.join(whisker, combo_folder)
 
-# --- Function to plot boxplots ---
-def plot_trial(left, right, condition, trial_type, trial_idx):
-    jitter, whisker, points = condition
-    plt.figure(figsize=(6,4))
-    
-    positions = [1, 2]
-    whis_value = 1.5 if whisker == "Tukey" else (0, 100) 
+# --- Figure shared by all plots rendered in one process ---
+fig, canvas, ax = None, None, None
+positions = [1, 2]  # x positions of the Left and Right boxes
+
+def init_figure():
+    """Create the Figure/Axes that plot_trials redraws for every data set.
+
+    Used as the Pool initializer so each worker process owns its own figure.
+    The figure is attached straight to an Agg canvas, bypassing pyplot.
+    """
+    global fig, canvas, ax
+    fig = Figure(figsize=(6,4), dpi=100)  # 600x400 px stimuli
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+
+# --- Functions to plot boxplots ---
+def plot_trials(left, right, stats, trial_type, trials):
+    """Draw and save the trials of one data set that share a whisker type.
+
+    stats are the boxplot_stats of [left, right] for that whisker type and
+    trials is a list of (condition, trial_idx). The boxes and axes are drawn
+    once; plot_trial then only adds each trial's points and title.
+    """
+    ax.cla()
+    ax.set_xlim(0.5, 2.5)
+    ax.set_ylim(*ylims[trial_type])
+    ax.set_autoscale_on(False)
     
     # Plot boxplots first
-    plt.boxplot([left, right],
-                positions=positions,
-                patch_artist=True,
-                widths=0.6,
-                flierprops=dict(marker='o', color='red', alpha=0.5),
-                whiskerprops=dict(color='black'),
-                showmeans=False,
-                whis=whis_value,
-                zorder=1)  
+    ax.bxp(stats,
+           positions=positions,
+           patch_artist=True,
+           widths=0.6,
+           flierprops=dict(marker='o', color='red', alpha=0.5),
+           whiskerprops=dict(color='black'),
+           showmeans=False,
+           zorder=1)  
+    
+    ax.set_ylabel("Value")
+    ax.set_xticks(positions)
+    ax.set_xticklabels(["Left", "Right"])
+    
+    for condition, trial_idx in trials:
+        plot_trial(left, right, condition, trial_type, trial_idx)
+
+def plot_trial(left, right, condition, trial_type, trial_idx):
+    """Overlay one trial's points and title on the drawn boxes and save it."""
+    jitter, whisker, points = condition
     
     # Add scatter points only if Points On
+    points_artist = None
     if points == "Points On":
         point_color = "seagreen"
-        for i, data in enumerate([left, right]):
-            if jitter == "Jitter On":
-                x = np.random.normal(positions[i], 0.05, size=len(data))
-            else:
-                x = np.full(len(data), positions[i]) 
-            plt.scatter(x, data, alpha=0.6, color=point_color, s=15, zorder=2) 
+        sizes = (len(left), len(right))
+        x = np.repeat(positions, sizes).astype(float)
+        if jitter == "Jitter On":
+            rng = np.random.default_rng([seed, trial_idx])
+            x += rng.normal(0.0, 0.05, size=sum(sizes))
+        points_artist = ax.scatter(x, np.concatenate([left, right]), alpha=0.6, color=point_color, s=15, zorder=2,
+                                   rasterized=True)
     
-    plt.ylabel("Value")
-    plt.xticks(positions, ["Left", "Right"])
-    plt.title(f"Trial {trial_idx} | {jitter} x {whisker} x {points}")
+    ax.set_title(f"Trial {trial_idx} | {jitter} x {whisker} x {points}")
     
     # Determine which design folder this plot belongs to
     design_folder = get_design_folder(condition)
     filename = f"{trial_idx}_{trial_type.replace(' ', '_')}_{jitter.replace(' ','')}_{whisker}_{points.replace(' ', '')}.png"
     
     # Save the plot to the organized folder structure
-    design_dir = os.path.join(output_dir, design_folder)
-    os.makedirs(design_dir, exist_ok=True)
-    filepath = os.path.join(design_dir, filename)
-    plt.savefig(filepath, dpi=150)
+    filepath = os.path.join(output_dir, design_folder, filename)
+    canvas.print_png(filepath)
     
-    # Also save to the "All" folder for convenience
-    all_dir = os.path.join(output_dir, "All")
-    os.makedirs(all_dir, exist_ok=True)
-    plt.savefig(os.path.join(all_dir, filename), dpi=150)
+    # Also place it in the "All" folder for convenience; the image is identical,
+    # so link (or copy) the file rather than rendering it a second time
+    all_path = os.path.join(all_dir, filename)
+    if os.path.exists(all_path):
+        os.remove(all_path)
+    try:
+        os.link(filepath, all_path)
+    except OSError:  # e.g. filesystem without hard links
+        shutil.copyfile(filepath, all_path)
     
-    plt.close()
+    # Leave the boxes in place for the next trial of this data set
+    if points_artist is not None:
+        points_artist.remove()
 
-# --- Generate data sets first ---
-num_instances_per_trial_type = 4  # number of different data sets per trial type
-data_sets = {}  # Store data sets: {(trial_type, instance_idx): (left, right)}
-
-print("Generating data sets...")
-for trial_type in trial_types:
-    for instance in range(num_instances_per_trial_type):
-        left, right = generate_trial_data(trial_type)
-        # Randomly swap left/right for some instances
-        if np.random.rand() > 0.5:
-            left, right = right, left
-        data_sets[(trial_type, instance)] = (left.copy(), right.copy())
-
-print(f"Generated {len(data_sets)} data sets ({num_instances_per_trial_type} per trial type)")
-
-# --- CSV log file ---
-csv_path = os.path.join(output_dir, "trial_sd_log.csv")
-with open(csv_path, "w", newline="") as f:
-    writer = csv.writer(f)
-    writer.writerow(["TrialIdx", "TrialType", "Instance", "Jitter", "Whisker", "Points", "Left_SD", "Right_SD", "More_Variable"])
-    
+if __name__ == "__main__":
+    # --- Generate data sets first ---
+    print("Generating data sets...")
+    rng = np.random.default_rng(seed)
+    data_sets = generate_data_sets(rng)
+
+    print(f"Generated {len(data_sets)} data sets ({num_instances_per_trial_type} per trial type)")
+
+    # --- Build CSV log rows and plotting tasks ---
+    # The log is written here in the parent process; the plotting tasks collected
+    # alongside it are rendered afterwards by the worker pool.
+    rows = []
+    tasks = []  # plot_trials arguments: (left, right, stats, trial_type, trials)
     trial_idx = 1
     # For each data set, create all condition combinations
     for trial_type in trial_types:
@@ -153,18 +228,41 @@ with open(csv_path, "w", newline="") as f:
                 more_var = "Right"
             else:
                 more_var = "Equal"
+            sd_fields = [f"{left_sd:.3f}", f"{right_sd:.3f}", more_var]
             
-            # Generate plots for all conditions using the same data
+            # Box/whisker statistics, shared by all conditions with the same whisker type
+            box_stats = {whisker: boxplot_stats([left, right], whis=whis)
+                         for whisker, whis in whis_values.items()}
+            
+            # Queue plots for all conditions using the same data, grouped by
+            # whisker type so each group's boxes are drawn only once
+            trials_by_whisker = {whisker: [] for whisker in whis_values}
             for condition in conditions:
                 # log one row
-                writer.writerow([
-                    trial_idx, trial_type, instance, condition[0], condition[1], condition[2],
-                    f"{left_sd:.3f}", f"{right_sd:.3f}", more_var
-                ])
+                rows.append([trial_idx, trial_type, instance, *condition, *sd_fields])
                 
-                # save figure
-                plot_trial(left, right, condition, trial_type, trial_idx)
+                trials_by_whisker[condition[1]].append((condition, trial_idx))
                 trial_idx += 1
+            
+            for whisker, trials in trials_by_whisker.items():
+                tasks.append((left, right, box_stats[whisker], trial_type, trials))
+
+    # --- CSV log file ---
+    csv_path = os.path.join(output_dir, "trial_sd_log.csv")
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["TrialIdx", "TrialType", "Instance", "Jitter", "Whisker", "Points", "Left_SD", "Right_SD", "More_Variable"])
+        writer.writerows(rows)
+
+    # --- Create the output folders once, before the workers write into them ---
+    for condition in conditions:
+        os.makedirs(os.path.join(output_dir, get_design_folder(condition)), exist_ok=True)
+    os.makedirs(all_dir, exist_ok=True)
+
+    # --- Render all figures in parallel ---
+    print(f"Rendering {len(rows)} boxplots on {os.cpu_count()} processes...")
+    with multiprocessing.Pool(os.cpu_count(), initializer=init_figure) as pool:
+        pool.starmap(plot_trials, tasks)
 
-print(f"All boxplots with trial indices saved in {output_dir}")
-print(f"SD log saved to {csv_path}")
+    print(f"All boxplots with trial indices saved in {output_dir}")
+    print(f"SD log saved to {csv_path}")
@@ -9,31 +9,56 @@ value is expected to be a JSON string containing an 'elementID' field.
 
 For each HTML file, it creates a corresponding .txt file with one elementID
 per line.
+
+Rather than parsing the whole document, the attribute values are located
+with a regular expression over a memory-mapped view of the file and only
+those values are decoded, so large files are never read into memory whole.
 """
+import html
 import json
+import mmap
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from html.parser import HTMLParser
 
-class ElementIDExtractor(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self.element_ids = []
+try:
+    # orjson is faster on the many small JSON blobs; its JSONDecodeError
+    # subclasses json.JSONDecodeError, so error handling is unchanged
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+# data-rbd-draggable-id="..." (or single-quoted); the value is captured as
+# undecoded bytes, still HTML-escaped, e.g. {&quot;elementID&quot;: ...}.
+# The pattern starts with the literal attribute name so the re engine can
+# jump between occurrences of it instead of trying a match at every byte.
+DRAGGABLE_ID_RE = re.compile(rb"""data-rbd-draggable-id\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+# Bytes that may precede an attribute name (the ASCII whitespace of \s)
+ATTR_SEPARATORS = frozenset(b' \t\n\r\f\v')
+
+@lru_cache(maxsize=4096)
+def parse_element_id(raw_value):
+    """Return the stripped elementID from a raw data-rbd-draggable-id value, or ''.
     
-    def handle_starttag(self, tag, attrs):
-        # Look for data-rbd-draggable-id attribute
-        for attr_name, attr_value in attrs:
-            if attr_name == 'data-rbd-draggable-id' and attr_value and attr_value.strip():
-                try:
-                    # Parse the JSON string
-                    data = json.loads(attr_value)
-                    # Extract elementID if it exists and is non-empty
-                    element_id = data.get('elementID', '')
-                    if element_id and element_id.strip():
-                        self.element_ids.append(element_id.strip())
-                except (json.JSONDecodeError, AttributeError):
-                    # If it's not JSON or doesn't have elementID, skip
-                    pass
+    Drag-and-drop lists often repeat the same attribute value, so results are
+    cached by the undecoded bytes.
+    """
+    attr_value = html.unescape(raw_value.decode('utf-8'))
+    if not attr_value or not attr_value.strip():
+        return ''
+    try:
+        # Parse the JSON string
+        data = json_loads(attr_value)
+        # Extract elementID if it exists and is non-empty
+        element_id = data.get('elementID', '')
+        if element_id and element_id.strip():
+            return element_id.strip()
+    except (json.JSONDecodeError, AttributeError):
+        # If it's not JSON or doesn't have elementID, skip
+        pass
+    return ''
 
 def extract_element_ids(html_file):
     """Extract all non-empty elementID values from data-rbd-draggable-id attributes.
@@ -44,17 +69,46 @@ def extract_element_ids(html_file):
     Returns:
         List of elementID strings
     """
-    parser = ElementIDExtractor()
-    
     try:
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-            parser.feed(content)
+        element_ids = []
+        with open(html_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap cannot map an empty file
+                return element_ids
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                for match in DRAGGABLE_ID_RE.finditer(content):
+                    start = match.start()
+                    if start == 0 or content[start - 1] not in ATTR_SEPARATORS:
+                        # Part of a longer name, e.g. x-data-rbd-draggable-id
+                        continue
+                    double_quoted, single_quoted = match.groups()
+                    raw_value = double_quoted if double_quoted is not None else single_quoted
+                    element_id = parse_element_id(raw_value)
+                    if element_id:
+                        element_ids.append(element_id)
     except Exception as e:
         print(f"Error reading {html_file}: {e}")
         return []
     
-    return parser.element_ids
+    return element_ids
+
+def process_one(html_file):
+    """Extract the elementIDs of one HTML file into its .txt counterpart.
+    
+    Args:
+        html_file: Path to the HTML file to process
+        
+    Returns:
+        Tuple of (output file path, number of elementIDs written)
+    """
+    element_ids = extract_element_ids(html_file)
+    
+    # Create output text file
+    output_file = html_file.with_suffix('.txt')
+    
+    output_file.write_text(''.join(f"{element_id}\n" for element_id in element_ids), encoding='utf-8')
+    
+    return output_file, len(element_ids)
 
 def main():
     # Find all HTML files in the htmls directory
@@ -71,19 +125,12 @@ def main():
     
     print(f"Found {len(html_files)} HTML files")
     
-    # Process each HTML file
-    for html_file in html_files:
-        print(f"Processing {html_file.name}...")
-        element_ids = extract_element_ids(html_file)
-        
-        # Create output text file
-        output_file = html_file.with_suffix('.txt')
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for element_id in element_ids:
-                f.write(f"{element_id}\n")
-        
-        print(f"  Extracted {len(element_ids)} non-empty element IDs -> {output_file.name}")
+    # Process the HTML files in parallel; results come back in input order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(process_one, html_files, chunksize=4)
+        for html_file, (output_file, count) in zip(html_files, results):
+            print(f"Processing {html_file.name}...")
+            print(f"  Extracted {count} non-empty element IDs -> {output_file.name}")
 
 if __name__ == '__main__':
     main()